@@ -1,21 +1,24 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import os
-import sys
+import re
+import html
 import logging
-import time
+import functools
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 from typing import Union
-import fitz # PyMuPDF
-import io # For handling in-memory PDF data
 
 # Import Azure storage utility
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from controllers.azure_storage import create_azure_storage_client, AzureBlobStorage
+from controllers.rate_limiter import HostRateLimiter
+from controllers.http_session import create_http_session, request_with_backoff, read_body
+from controllers.pdf_renderer import rasterize_first_page, get_render_pool
 
 # Setup logging
 logging.basicConfig(
@@ -33,18 +36,65 @@ BASE_URL_FORMAT = "http://www.takungpao.com.hk/paper/{date_str}.html"
 START_DATE = datetime(2024, 8, 31) # This is your desired start date
 END_DATE = datetime(2025, 8, 1)
 PUBLISHER_NAME = "TaKungPao"
-TEMP_PDF_DIR = "temp_downloads"
 MISSING_PAGES_LOG = "missing_pages.log" # New file for missing pages
+REQUESTS_PER_SECOND = 5 # Average politeness budget per host
+REQUEST_BURST = 5 # Requests allowed back-to-back before the limiter starts spacing them out
+PDF_WORKERS = 8 # Concurrent PDFs processed per date
+DATE_WORKERS = 4 # Dates processed concurrently
+ZOOM = 2.0 # Render scale for PDF pages (2.0 = 144 DPI)
+JPG_QUALITY = 80 # JPEG quality for uploaded pages; lower means smaller uploads
+# Matches the downloadurl attribute of <img> tags on the e-paper index page; the value is group 2.
+# The lookbehind skips attributes like data-downloadurl, and the backreference lets a value contain the other quote
+DOWNLOAD_URL_PATTERN = re.compile(r"""<img\b[^>]*?(?<![-\w])downloadurl\s*=\s*(["'])(.*?)\1""", re.IGNORECASE)
 
-# Create necessary temporary directory
-Path(TEMP_PDF_DIR).mkdir(parents=True, exist_ok=True)
+# Request budget shared by all workers, see HostRateLimiter
+RATE_LIMITER = HostRateLimiter(REQUESTS_PER_SECOND, burst=REQUEST_BURST)
 
+# Shared HTTP session so every request reuses pooled keep-alive connections
+SESSION = create_http_session(pool_maxsize=DATE_WORKERS * PDF_WORKERS, rate_limiter=RATE_LIMITER)
 
-def log_missing_page(date: datetime, original_pdf_url: str, expected_azure_page_num: int, reason: str):
-    """Logs details of a missing page to a dedicated file."""
-    message = f"DATE: {date.strftime('%Y-%m-%d')}, URL: {original_pdf_url}, Expected Azure Page: {expected_azure_page_num}, Reason: {reason}\n"
-    with open(MISSING_PAGES_LOG, 'a') as f:
-        f.write(message)
+
+
+@functools.lru_cache(maxsize=None)
+def get_azure_client() -> AzureBlobStorage:
+    """
+    Returns the process-wide Azure Blob Storage client, creating it on first use.
+    Reusing one client keeps the Azure SDK's HTTP connection pool alive across all dates.
+    """
+    return create_azure_storage_client()
+
+
+# Missing pages log is kept open for the whole run and shared by the worker threads
+_missing_pages_lock = threading.Lock()
+_missing_pages_file = None
+
+
+def open_missing_pages_log(truncate: bool = False):
+    """
+    Opens the shared missing pages log handle (line-buffered), replacing any handle already open.
+    With `truncate`, entries from a previous run are discarded. The handle is closed at exit.
+    """
+    global _missing_pages_file
+    with _missing_pages_lock:
+        if _missing_pages_file is not None:
+            _missing_pages_file.close()
+        _missing_pages_file = open(MISSING_PAGES_LOG, 'w' if truncate else 'a', buffering=1)
+
+
+@atexit.register
+def _close_missing_pages_log():
+    with _missing_pages_lock:
+        if _missing_pages_file is not None:
+            _missing_pages_file.close()
+
+
+def log_missing_page(date_iso: str, original_pdf_url: str, expected_azure_page_num: int, reason: str):
+    """Logs details of a missing page to a dedicated file. `date_iso` is the date formatted as YYYY-MM-DD."""
+    message = f"DATE: {date_iso}, URL: {original_pdf_url}, Expected Azure Page: {expected_azure_page_num}, Reason: {reason}\n"
+    if _missing_pages_file is None:
+        open_missing_pages_log()
+    with _missing_pages_lock:
+        _missing_pages_file.write(message)
     logger.warning(f"Logged missing page: {message.strip()}")
 
 
@@ -58,25 +108,32 @@ def get_download_urls(date_str: str) -> list[str]:
 
     download_urls = []
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        response = request_with_backoff(SESSION, 'GET', url, timeout=15)
+        # Missing dates are common (holidays), so branch on the status instead of raising and catching
+        if response.status_code == 404:
+            logger.warning(f"Page not found (404) for {date_str}. This might be a holiday. Skipping.")
+            return download_urls
+        if response.status_code >= 400:
+            logger.error(f"Error fetching the page {url}: HTTP {response.status_code}")
+            return download_urls
+
+        html_text = response.text
+
+        # Fast path: pull the attribute values out with a single regex scan instead of building a parse tree
+        download_urls = [html.unescape(match.group(2)) for match in DOWNLOAD_URL_PATTERN.finditer(html_text) if match.group(2)]
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        img_tags = soup.find_all('img', downloadurl=True)
+        if not download_urls:
+            # Fall back to a full parse in case the markup doesn't match the expected attribute layout
+            soup = BeautifulSoup(html_text, 'html.parser')
+            img_tags = soup.find_all('img', downloadurl=True)
 
-        for img_tag in img_tags:
-            download_url = img_tag.get('downloadurl')
-            if download_url:
-                download_urls.append(download_url)
+            for img_tag in img_tags:
+                download_url = img_tag.get('downloadurl')
+                if download_url:
+                    download_urls.append(download_url)
 
     except requests.exceptions.RequestException as e:
-        if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 404:
-            logger.warning(f"Page not found (404) for {date_str}. This might be a holiday. Skipping.")
-        else:
-            logger.error(f"Error fetching the page {url}: {e}")
+        logger.error(f"Error fetching the page {url}: {e}")
     except Exception as e:
         logger.error(f"An unexpected error occurred while processing {url}: {e}")
 
@@ -91,21 +148,19 @@ def get_download_urls(date_str: str) -> list[str]:
 #     pass
 
 
-def download_pdf(pdf_url: str, temp_pdf_path: Path) -> Union[Path, None]:
+def download_pdf(pdf_url: str) -> Union[bytes, None]:
     """
-    Downloads a PDF file from the given URL and saves it to a temporary directory.
+    Downloads a PDF file from the given URL and returns its contents in memory.
     Increased timeout to 60 seconds.
     """
-    logger.info(f"Downloading PDF from: {pdf_url} to {temp_pdf_path}")
+    logger.info(f"Downloading PDF from: {pdf_url}")
     try:
-        response = requests.get(pdf_url, stream=True, timeout=60) # Increased timeout
-        response.raise_for_status()
+        with request_with_backoff(SESSION, 'GET', pdf_url, stream=True, timeout=60) as response: # Increased timeout
+            response.raise_for_status()
 
-        with open(temp_pdf_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        logger.info(f"Successfully downloaded PDF: {temp_pdf_path}")
-        return temp_pdf_path
+            pdf_bytes = read_body(response)
+        logger.info(f"Successfully downloaded PDF ({len(pdf_bytes)} bytes): {pdf_url}")
+        return pdf_bytes
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Error downloading PDF from {pdf_url}: {e}")
@@ -115,87 +170,106 @@ def download_pdf(pdf_url: str, temp_pdf_path: Path) -> Union[Path, None]:
         return None
 
 
-def convert_pdf_and_upload(pdf_path: Path, azure_client: AzureBlobStorage, date: datetime, starting_azure_page_num: int, original_pdf_url: str) -> int:
+def convert_pdf_and_upload(pdf_bytes: bytes, azure_client: AzureBlobStorage, date: datetime, date_iso: str, starting_azure_page_num: int, original_pdf_url: str) -> bool:
     """
-    Converts a single-page PDF to JPG, uploads it to Azure, and handles cleanup.
-    Only uploads if the blob does not already exist.
-    Returns 1 if the page was successfully processed (uploaded or already existed), 0 otherwise.
+    Converts a single-page PDF held in memory to JPG and uploads it to Azure.
+    The caller has already checked that the page is not in Azure yet.
+    `date_iso` is the pre-formatted YYYY-MM-DD string used for logging.
+    Returns True if the page was uploaded, False otherwise.
     """
-    pages_processed_count = 0
-    
-    if not pdf_path or not pdf_path.exists():
-        logger.error(f"PDF file not found for conversion: {pdf_path}. This should ideally be caught earlier.")
-        log_missing_page(date, original_pdf_url, starting_azure_page_num, "PDF file not found locally for conversion.")
-        return 0
+    if not pdf_bytes:
+        logger.error(f"No PDF data to convert for {original_pdf_url}. This should ideally be caught earlier.")
+        log_missing_page(date_iso, original_pdf_url, starting_azure_page_num, "PDF data empty for conversion.")
+        return False
 
-    try:
-        with fitz.open(pdf_path) as doc:
-            # Assuming all PDFs have only one page
-            if doc.page_count != 1:
-                logger.warning(f"PDF {pdf_path.name} was expected to have 1 page but has {doc.page_count}. Processing only the first page as intended.")
-
-            page_num_for_azure_upload = starting_azure_page_num
-            file_extension = "jpg" # Output format for Azure
-
-            # This check here is a secondary, page-level check, mostly for robustness
-            # in case the pre-check was imperfect or if a blob was deleted manually.
-            if azure_client.blob_exists(PUBLISHER_NAME, date, page_num_for_azure_upload, file_extension):
-                logger.info(f"Page {page_num_for_azure_upload} for {date.strftime('%Y-%m-%d')} already exists in Azure. Skipping upload.")
-                pages_processed_count = 1 # Mark as processed if it exists
-            else:
-                temp_jpg_name = f"{pdf_path.stem}_page_1.jpeg" # Always page 1
-                temp_jpg_path = Path(TEMP_PDF_DIR) / temp_jpg_name 
-
-                try:
-                    page = doc.load_page(0) # Load the first (and only) page
-                    zoom = 2.0
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=mat)
-
-                    pix.save(temp_jpg_path, "jpeg")
-                    logger.info(f"Successfully converted page 1 to JPG: {temp_jpg_path.name}")
-
-                    with open(temp_jpg_path, 'rb') as f:
-                        image_data = f.read()
-
-                    uploaded_url = azure_client.upload_image(
-                        publisher_name=PUBLISHER_NAME,
-                        date=date,
-                        page_num=page_num_for_azure_upload,
-                        image_data=image_data,
-                        file_extension=file_extension
-                    )
-                    if uploaded_url:
-                        logger.info(f"Uploaded page {page_num_for_azure_upload} to Azure: {uploaded_url}")
-                        pages_processed_count = 1
-                    else:
-                        logger.error(f"Failed to upload page {page_num_for_azure_upload} to Azure.")
-                        log_missing_page(date, original_pdf_url, page_num_for_azure_upload, f"Failed to upload JPG from PDF page 1")
-                except Exception as convert_e:
-                    logger.error(f"Failed to convert or upload page 1 (expected Azure page {page_num_for_azure_upload}) of {pdf_path.name}: {convert_e}")
-                    log_missing_page(date, original_pdf_url, page_num_for_azure_upload, f"Failed to convert or upload PDF page 1")
-                finally:
-                    if temp_jpg_path.exists():
-                        os.remove(temp_jpg_path)
-                        logger.info(f"Cleaned up temporary JPG: {temp_jpg_path.name}")
-
-            logger.info(f"Finished attempting to process page from {pdf_path.name}. Successfully processed {pages_processed_count} page(s).")
+    page_num_for_azure_upload = starting_azure_page_num
+    file_extension = "jpg" # Output format for Azure
 
+    try:
+        # Rendering runs on the process pool; this thread only waits for the JPEG bytes
+        actual_pages, image_data = get_render_pool().submit(rasterize_first_page, pdf_bytes, ZOOM, JPG_QUALITY).result()
+        # Assuming all PDFs have only one page
+        if actual_pages != 1:
+            logger.warning(f"PDF {original_pdf_url} was expected to have 1 page but has {actual_pages}. Processing only the first page as intended.")
     except Exception as e:
-        logger.error(f"Error opening or processing PDF {pdf_path.name}: {e}")
-        log_missing_page(date, original_pdf_url, starting_azure_page_num, f"Failed to open/process entire PDF. Page {starting_azure_page_num} likely missing.")
-        return 0 
+        logger.error(f"Error opening or processing PDF {original_pdf_url}: {e}")
+        log_missing_page(date_iso, original_pdf_url, starting_azure_page_num, f"Failed to open/process entire PDF. Page {starting_azure_page_num} likely missing.")
+        return False
+
+    success = False
+    try:
+        logger.info(f"Successfully converted page 1 of {original_pdf_url} to JPG ({len(image_data) / 1024:.0f} KB at zoom {ZOOM}, quality {JPG_QUALITY}).")
+
+        uploaded_url = azure_client.upload_image(
+            publisher_name=PUBLISHER_NAME,
+            date=date,
+            page_num=page_num_for_azure_upload,
+            image_data=image_data,
+            file_extension=file_extension
+        )
+        if uploaded_url:
+            logger.info(f"Uploaded page {page_num_for_azure_upload} to Azure: {uploaded_url}")
+            success = True
+        else:
+            logger.error(f"Failed to upload page {page_num_for_azure_upload} to Azure.")
+            log_missing_page(date_iso, original_pdf_url, page_num_for_azure_upload, f"Failed to upload JPG from PDF page 1")
+    except Exception as convert_e:
+        logger.error(f"Failed to convert or upload page 1 (expected Azure page {page_num_for_azure_upload}) of {original_pdf_url}: {convert_e}")
+        log_missing_page(date_iso, original_pdf_url, page_num_for_azure_upload, f"Failed to convert or upload PDF page 1")
 
-    return pages_processed_count
+    logger.info(f"Finished attempting to process page from {original_pdf_url}. Successfully processed {int(success)} page(s).")
+    return success
 
 
-def scrape_date(date: datetime, azure_client: AzureBlobStorage) -> bool:
+def _process_one_pdf(i: int, pdf_url: str, date: datetime, date_iso: str, azure_client: AzureBlobStorage, existing_pages: set[int]) -> tuple[int, bool]:
+    """
+    Checks, downloads, converts and uploads a single PDF of an issue.
+    Runs inside the per-date thread pool. PDFs are assumed to be 1 page, so PDF i maps to Azure page i+1
+    regardless of the page count actually found in the file.
+    `existing_pages` holds the Azure page numbers already uploaded for this date.
+    Returns (azure_page_num, success).
+    """
+    expected_azure_page_num = i + 1
+
+    # IMPORTANT NEW LOGIC: Check if the expected output JPG blob for this PDF is already in Azure BEFORE downloading
+    if expected_azure_page_num in existing_pages:
+        logger.info(f"Page {expected_azure_page_num} for {date_iso} already exists in Azure. Skipping download and processing this PDF.")
+        return expected_azure_page_num, True
+
+    # If we reach here, we need to download and process the PDF because the blob does not exist
+    pdf_bytes = download_pdf(pdf_url)
+
+    if not pdf_bytes:
+        logger.warning(f"Failed to download PDF from {pdf_url}. Skipping conversion and upload for this PDF.")
+        log_missing_page(date_iso, pdf_url, expected_azure_page_num, "PDF download failed. Page likely missing.")
+        return expected_azure_page_num, False
+
+    success = convert_pdf_and_upload(
+        pdf_bytes,
+        azure_client,
+        date,
+        date_iso,
+        starting_azure_page_num=expected_azure_page_num,
+        original_pdf_url=pdf_url
+    )
+
+    if success:
+        existing_pages.add(expected_azure_page_num)
+    return expected_azure_page_num, success
+
+
+def scrape_date(date: datetime, azure_client: Union[AzureBlobStorage, None] = None) -> bool:
     """
     Scrapes the e-paper for a specific date, downloads PDFs,
     converts them to JPGs, and uploads them to Azure Blob Storage, checking for existing blobs.
-    Assumes all PDFs have only one page.
+    Assumes all PDFs have only one page, so Azure page numbers (1..N) are assigned up front
+    and the PDFs are processed concurrently on a bounded thread pool.
+    Uses the shared client from get_azure_client() when azure_client is not given.
     """
+    if azure_client is None:
+        azure_client = get_azure_client()
     date_str = date.strftime('%Y%m%d')
+    date_iso = date.strftime('%Y-%m-%d')
     logger.info(f"\n--- Processing date: {date_str} ---")
 
     pdf_urls = get_download_urls(date_str)
@@ -206,68 +280,25 @@ def scrape_date(date: datetime, azure_client: AzureBlobStorage) -> bool:
 
     logger.info(f"Found {len(pdf_urls)} PDF URLs for {date_str}.")
 
-    current_output_page_num = 1    
-    date_has_any_failures = False 
-
-    for i, pdf_url in enumerate(pdf_urls):
-        logger.info(f"Evaluating PDF {i+1}/{len(pdf_urls)} for {date_str}: {pdf_url}")
-
-        # Assuming all PDFs are 1 page
-        expected_pages_from_this_pdf = 1 
-
-        # IMPORTANT NEW LOGIC: Check if the expected output JPG blob for this PDF is already in Azure BEFORE downloading
-        expected_azure_page_num = current_output_page_num
-        if azure_client.blob_exists(PUBLISHER_NAME, date, expected_azure_page_num, "jpg"):
-            logger.info(f"Page {expected_azure_page_num} for {date.strftime('%Y-%m-%d')} already exists in Azure. Skipping download and processing this PDF.")
-            current_output_page_num += expected_pages_from_this_pdf # Advance page number correctly
-            time.sleep(0.1) # Small delay even on skip for politeness
-            continue # Skip to the next PDF URL in the list, avoiding download
-
-        # If we reach here, we need to download and process the PDF because the blob does not exist
-        temp_pdf_path = Path(TEMP_PDF_DIR) / f"{date_str}_pdf_{i}.pdf"
-        downloaded_pdf_path = download_pdf(pdf_url, temp_pdf_path)
-
-        if downloaded_pdf_path:
-            pages_successfully_processed_from_this_pdf = convert_pdf_and_upload(
-                downloaded_pdf_path,    
-                azure_client,    
-                date,    
-                starting_azure_page_num=current_output_page_num,
-                original_pdf_url=pdf_url
-            )
-            
-            # Since we assume 1 page, actual_pages_in_downloaded_pdf is always 1 unless there's a critical error
-            # in opening the PDF.
-            # We explicitly check for 1 page here, logging a warning if it's not.
-            actual_pages_in_downloaded_pdf = 1
+    # One prefix listing per date instead of a blob_exists round-trip per PDF
+    existing_pages = azure_client.list_existing_pages(PUBLISHER_NAME, date, "jpg")
+    date_has_any_failures = False
+
+    with ThreadPoolExecutor(max_workers=PDF_WORKERS) as executor:
+        futures = [
+            executor.submit(_process_one_pdf, i, pdf_url, date, date_iso, azure_client, existing_pages)
+            for i, pdf_url in enumerate(pdf_urls)
+        ]
+        for future in as_completed(futures):
             try:
-                with fitz.open(downloaded_pdf_path) as doc_check:
-                    if doc_check.page_count != 1:
-                        logger.warning(f"Downloaded PDF {downloaded_pdf_path.name} was expected to have 1 page but actually has {doc_check.page_count}.")
-                        # Even if it has more, we only process the first one in convert_pdf_and_upload,
-                        # but for numbering continuity, we still advance by 1 for this source PDF.
+                page_num, success = future.result()
             except Exception as e:
-                logger.error(f"Could not open downloaded PDF {downloaded_pdf_path} to verify page count, assuming 1 page for numbering: {e}")
-                log_missing_page(date, pdf_url, current_output_page_num, "Could not open downloaded PDF to verify page count. Page assumed missing.")
-                date_has_any_failures = True # Mark date as having issues
-            finally: # PDF cleanup
-                if downloaded_pdf_path.exists():
-                    os.remove(downloaded_pdf_path)
-                    logger.info(f"Cleaned up temporary PDF: {downloaded_pdf_path.name}")
-
-            current_output_page_num += actual_pages_in_downloaded_pdf # Always advance by 1
-            logger.info(f"Advanced output page number by {actual_pages_in_downloaded_pdf} page(s). Next PDF will start at Azure page {current_output_page_num}.")
-
-            if pages_successfully_processed_from_this_pdf == 0: # If convert_pdf_and_upload failed
+                logger.error(f"Unexpected error while processing a PDF for {date_iso}: {e}")
+                date_has_any_failures = True
+                continue
+            if not success:
+                logger.warning(f"Page {page_num} for {date_iso} was not processed successfully.")
                 date_has_any_failures = True
-        else:
-            logger.warning(f"Failed to download PDF from {pdf_url}. Skipping conversion and upload for this PDF.")
-            log_missing_page(date, pdf_url, current_output_page_num, "PDF download failed. Page likely missing.")
-            
-            current_output_page_num += expected_pages_from_this_pdf # Advance page number even if PDF download failed
-            date_has_any_failures = True # Mark date as having issues
-
-        time.sleep(0.1) # Polite scraping delay between PDFs
 
     return not date_has_any_failures
 
@@ -276,51 +307,57 @@ def main():
     logger.info("=== Starting Ta Kung Pao E-Paper Scraper ===")
 
     # Initialize missing pages log file (clear it if it exists from a previous run, or just create it)
-    if os.path.exists(MISSING_PAGES_LOG):
-        os.remove(MISSING_PAGES_LOG)
+    open_missing_pages_log(truncate=True)
     logger.info(f"Created/Cleared missing pages log: {MISSING_PAGES_LOG}")
 
-    azure_client = create_azure_storage_client()
+    azure_client = get_azure_client()
     if not azure_client:
         logger.error("Failed to initialize Azure Blob Storage client. Exiting.")
         return
 
     # Always start from START_DATE as checkpoint logic has been removed.
     start_from_date = START_DATE
-    logger.info(f"Starting from configured START_DATE: {start_from_date.strftime('%Y-%m-%d')}")
+    start_from_iso = start_from_date.strftime('%Y-%m-%d')
+    logger.info(f"Starting from configured START_DATE: {start_from_iso}")
 
     # Ensure END_DATE is not before start_from_date, and not in the future.
     effective_end_date = min(END_DATE, datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    effective_end_iso = effective_end_date.strftime('%Y-%m-%d')
     if start_from_date > effective_end_date:
-        logger.info(f"Start date {start_from_date.strftime('%Y-%m-%d')} is after current effective end date {effective_end_date.strftime('%Y-%m-%d')}. No new dates to scrape.")
+        logger.info(f"Start date {start_from_iso} is after current effective end date {effective_end_iso}. No new dates to scrape.")
         return
 
     total_dates_to_scrape = (effective_end_date - start_from_date).days + 1
-    logger.info(f"Will attempt to scrape {total_dates_to_scrape} dates from {start_from_date.strftime('%Y-%m-%d')} to {effective_end_date.strftime('%Y-%m-%d')}.")
+    logger.info(f"Will attempt to scrape {total_dates_to_scrape} dates from {start_from_iso} to {effective_end_iso}.")
 
-    current_date = start_from_date
+    dates_to_scrape = [start_from_date + timedelta(days=offset) for offset in range(total_dates_to_scrape)]
+    attempted_dates = []
     processed_count = 0
-    while current_date <= effective_end_date:
-        try:
-            # Call scrape_date for each date. It handles internal errors and continues.
-            scrape_date(current_date, azure_client)
-            
-            processed_count += 1
-            if processed_count % 10 == 0:
-                logger.info(f"Processed {processed_count} dates. Taking a longer break.")
-                time.sleep(5) # Long break after 10 dates
-            else:
-                time.sleep(1) # Short break between dates
-
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during scraping for {current_date.strftime('%Y-%m-%d')}: {e}")
-            # If a date-level error occurs, we still break to prevent uncontrolled execution.
-            break    
-
-        current_date += timedelta(days=1)
-
-    final_processed_date = current_date - timedelta(days=1) if current_date > start_from_date else start_from_date
+
+    # Dates write to distinct Azure prefixes, so several run at once (rate limited by SESSION)
+    with ThreadPoolExecutor(max_workers=DATE_WORKERS) as executor:
+        futures = {executor.submit(scrape_date, current_date, azure_client): current_date for current_date in dates_to_scrape}
+        for future in as_completed(futures):
+            current_date = futures[future]
+            attempted_dates.append(current_date)
+            try:
+                # scrape_date handles internal errors and continues.
+                future.result()
+
+                processed_count += 1
+                if processed_count % 10 == 0:
+                    logger.info(f"Processed {processed_count} dates.")
+
+            except Exception as e:
+                logger.error(f"An unexpected error occurred during scraping for {current_date.strftime('%Y-%m-%d')}: {e}")
+                # If a date-level error occurs, we still stop to prevent uncontrolled execution.
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    final_processed_date = max(attempted_dates, default=start_from_date)
     logger.info(f"Scraping session finished. Last attempted date: {final_processed_date.strftime('%Y-%m-%d')}.")
+    get_render_pool().shutdown()
     logger.info("=== Ta Kung Pao E-Paper Scraper Finished ===")
 
 
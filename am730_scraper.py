@@ -1,57 +1,119 @@
-import os
 import sys
 import logging
-import time
+import argparse
+import functools
+import json
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import threading
 from datetime import datetime, timedelta
-from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-import fitz # PyMuPDF library for PDF conversion
 
 # Import Azure storage utility from a parent directory
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from controllers.azure_storage import create_azure_storage_client, AzureBlobStorage
+from controllers.http_session import create_http_session, request_with_backoff, read_body
+from controllers.rate_limiter import HostRateLimiter
+from controllers.upload_state import UploadState
+from controllers.pdf_renderer import rasterize_first_page, get_render_pool
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("am730_scraper.log"),
-        logging.StreamHandler()
-    ]
-)
+# Setup logging: worker threads only enqueue records, a background listener writes them out
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+log_handlers = [logging.FileHandler("am730_scraper.log"), logging.StreamHandler()]
+for log_handler in log_handlers:
+    log_handler.setFormatter(log_formatter)
+log_queue = queue.Queue(-1)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s')) # Final formatting happens in the listener's handlers
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+LOG_LISTENER = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop) # Registered first, so it runs last and flushes every record
 logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
 START_DATE = datetime(2021, 1, 22)
 END_DATE = datetime(2025, 7, 18)
 PUBLISHER_NAME = "am730"
-TEMP_DIR = "temp_downloads"
+MAX_PAGES = 200 # Assuming max 200 pages per issue
+PAGE_NUMS = tuple(f"{page_num:04d}" for page_num in range(1, MAX_PAGES + 1)) # Zero-padded page numbers used in URLs, PAGE_NUMS[page_num - 1]
+PAGE_FETCH_WORKERS = 10 # Pages downloaded concurrently per issue
+DATE_WORKERS = 4 # Issues processed concurrently
+UPLOAD_WORKERS = 8 # Pages converted/uploaded in the background per issue while the next pages download
+REQUESTS_PER_SECOND = 10 # Average politeness budget per host
+REQUEST_BURST = 10 # Requests allowed back-to-back before the limiter starts spacing them out
 
-# Create temp directory
-Path(TEMP_DIR).mkdir(parents=True, exist_ok=True)
+# Request budget shared by all workers, see HostRateLimiter
+RATE_LIMITER = HostRateLimiter(REQUESTS_PER_SECOND, burst=REQUEST_BURST)
+
+# Shared HTTP session so every page request reuses pooled keep-alive connections
+SESSION = create_http_session(pool_maxsize=DATE_WORKERS * PAGE_FETCH_WORKERS, rate_limiter=RATE_LIMITER)
+
+# Let Azure fetch JPG pages from the CDN itself instead of relaying the bytes through this machine
+COPY_JPG_FROM_URL = True
+
+# Render scale for PDF pages (reduced from 2x to 1x for speed)
+PDF_ZOOM = 1.0
+# JPEG quality for rendered PDF pages; 80 keeps 1x newspaper text legible at a clearly smaller size than 95
+JPG_QUALITY = 80
+
+# URL formats to check for each issue, in order of priority (highest quality first)
+FORMATS_TO_CHECK = [
+    {'type': 'pdf', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/downloads/page0001.pdf', 'date_format': '%Y-%m-%d'},
+    {'type': 'jpg', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/page-html5-substrates/page0001_3.jpg', 'date_format': '%Y-%m-%d'},
+    {'type': 'jpg', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/page-html5-substrates/page0001_3.jpg', 'date_format': '%d_%m_%Y'},
+]
+
+# Which format each month's issues use, so the per-date HEAD probes can usually be skipped
+FORMAT_CACHE_FILE = "am730_format_cache.json"
+_format_cache_lock = threading.Lock()
+_format_cache = None
+
+# Local record of uploaded pages, so resumed runs don't need to list everything in Azure
+UPLOAD_STATE_DB = "am730_state.db"
 
 def is_weekday(date):
     """Checks if a date is a weekday (Monday=0, Sunday=6)."""
     return date.weekday() < 5
 
 def get_date_range(start_date, end_date):
-    """Generates a list of weekday dates to scrape."""
+    """Generates a list of weekday dates to scrape, stepping straight over weekends."""
     current_date = start_date
+    if not is_weekday(current_date):
+        current_date += timedelta(days=7 - current_date.weekday()) # Move to the following Monday
     while current_date <= end_date:
-        if is_weekday(current_date):
-            yield current_date
-        current_date += timedelta(days=1)
+        yield current_date
+        current_date += timedelta(days=3 if current_date.weekday() == 4 else 1) # Friday -> Monday
 
-def upload_to_azure(azure_client, filepath, date, page_num, extension):
+@functools.lru_cache(maxsize=None)
+def get_upload_state():
+    """Returns the local upload state database, opening it on first use. It is committed and closed at exit."""
+    upload_state = UploadState(UPLOAD_STATE_DB)
+    atexit.register(upload_state.close)
+    return upload_state
+
+def convert_and_upload(azure_client, pdf_bytes, date, page_num):
     """
-    Uploads a file to Azure Blob Storage and handles any errors.
+    Converts a downloaded PDF page to JPG on the process pool, then uploads it to Azure.
+    Returns True if the page was uploaded.
     """
     try:
-        logger.info(f"Uploading to Azure: {filepath}")
-        with open(filepath, 'rb') as f:
-            image_data = f.read()
-        
+        _, image_data = get_render_pool().submit(rasterize_first_page, pdf_bytes, PDF_ZOOM, JPG_QUALITY).result() # Encoded in memory, no temp JPG
+        logger.debug("Successfully converted page %d to JPG.", page_num)
+    except Exception as convert_e:
+        logger.error(f"Error converting page {page_num} to JPG: {convert_e}")
+        return False
+    return upload_to_azure(azure_client, image_data, date, page_num, "jpeg")
+
+def upload_to_azure(azure_client, image_data, date, page_num, extension):
+    """
+    Uploads in-memory image bytes to Azure Blob Storage and handles any errors.
+    """
+    try:
+        logger.debug("Uploading page %d to Azure (%d bytes)", page_num, len(image_data))
         blob_url = azure_client.upload_image(
             publisher_name=PUBLISHER_NAME,
             date=date,
@@ -60,7 +122,7 @@ def upload_to_azure(azure_client, filepath, date, page_num, extension):
             file_extension=extension
         )
         if blob_url:
-            logger.info(f"Successfully uploaded to Azure: {blob_url}")
+            logger.debug("Successfully uploaded to Azure: %s", blob_url)
             return True
         else:
             logger.error("Failed to upload to Azure")
@@ -69,151 +131,348 @@ def upload_to_azure(azure_client, filepath, date, page_num, extension):
         logger.error(f"Azure upload error: {e}")
         return False
 
-def download_and_convert_pdf(date, azure_client):
+def fetch_page(url):
+    """
+    Downloads a single page and returns (status_code, content, error).
+    content is only set for 200 responses; error is set when the request itself failed.
+    """
+    logger.debug("Attempting to download %s", url)
+    try:
+        with request_with_backoff(SESSION, 'GET', url, stream=True, timeout=10) as response: # Releases the pooled connection on every exit path
+            if response.status_code != 200:
+                return response.status_code, None, None
+            return 200, read_body(response), None
+    except requests.exceptions.RequestException as e:
+        return None, None, e
+
+def probe_page(url, timeout=5):
+    """
+    Checks whether a page exists with a HEAD request, without downloading its body.
+    If the server rejects HEAD (405/501), a GET for just the first byte is sent instead;
+    a 206 Partial Content answer is reported as 200.
+    Redirects are not followed, so a missing page redirected to an HTML page never reads as 200.
+    Returns (status_code, error); error is set when the request itself failed.
+    """
+    try:
+        response = request_with_backoff(SESSION, 'HEAD', url, timeout=timeout, allow_redirects=False)
+        if response.status_code not in (405, 501):
+            return response.status_code, None
+        with request_with_backoff(SESSION, 'GET', url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=timeout,
+                                  allow_redirects=False) as response:
+            return (200 if response.status_code == 206 else response.status_code), None
+    except requests.exceptions.RequestException as e:
+        return None, e
+
+def find_last_page(url_for_page, existing_pages):
+    """
+    Finds the number of the last page of an issue with HEAD probes instead of probing every page.
+    Starts after the run of pages 1..N already in Azure, gallops forward in doubling steps until a
+    page is missing, then binary-searches the gap, so a 60-page issue costs ~12 probes and an issue
+    that is already complete in Azure costs one.
+    `url_for_page` maps a page number to its URL. Returns 0 if the issue has no pages.
+    """
+    def page_exists(page_num):
+        status_code, error = probe_page(url_for_page(page_num))
+        if error is not None or not (status_code in (200, 403, 404) or 300 <= status_code < 400): # Redirects mean missing
+            logger.warning(f"Unexpected probe result for page {page_num} ({error or status_code}). Treating it as missing.")
+        return error is None and status_code == 200
+
+    low = 0 # Last page known to exist
+    while low + 1 in existing_pages:
+        low += 1
+    high = None # First page known to be missing
+    step = 1
+    while high is None:
+        candidate = low + step
+        if candidate > MAX_PAGES:
+            high = MAX_PAGES + 1
+        elif page_exists(candidate):
+            low = candidate
+            step *= 2
+        else:
+            high = candidate
+
+    while high - low > 1:
+        mid = (low + high) // 2
+        if page_exists(mid):
+            low = mid
+        else:
+            high = mid
+    return low
+
+def get_candidate_pages(existing_pages, last_page):
+    """Returns the page numbers up to last_page that are not already in Azure, so gaps from earlier runs get filled."""
+    return [page_num for page_num in range(1, last_page + 1) if page_num not in existing_pages]
+
+def iter_issue_pages(page_urls):
+    """
+    Fetches (page_num, url) pairs concurrently, PAGE_FETCH_WORKERS at a time, and yields
+    (page_num, url, status_code, content, error) in page order.
+    Iteration stops after the first page that could not be downloaded.
+    """
+    with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+        for window_start in range(0, len(page_urls), PAGE_FETCH_WORKERS):
+            window = page_urls[window_start:window_start + PAGE_FETCH_WORKERS]
+            futures = [executor.submit(fetch_page, url) for _, url in window]
+            for (page_num, url), future in zip(window, futures):
+                status_code, content, error = future.result()
+                yield page_num, url, status_code, content, error
+                if error is not None or status_code != 200:
+                    return
+
+def list_existing_pages(azure_client, date):
+    """Lists the pages of a date already in Azure and records them in the local upload state."""
+    existing_pages = azure_client.list_existing_pages(PUBLISHER_NAME, date, "jpeg")
+    get_upload_state().record_pages(date.strftime('%Y-%m-%d'), existing_pages)
+    return existing_pages
+
+def download_and_convert_pdf(date, azure_client, existing_pages=None):
     """
     Downloads each page as a PDF, converts it to a high-quality JPG, and uploads it to Azure.
+    Pages are fetched concurrently and then converted/uploaded in page order.
     Includes page-level existence check for resumption and 429 error handling.
+    `existing_pages` holds the page numbers already in Azure; it is listed from Azure if not given.
     """
     pages_converted = 0
     date_str = date.strftime("%Y-%m-%d")
     base_pdf_url = f"https://flippingbook.am730.com.hk/daily-news/{date_str}/files/assets/common/downloads/page"
     
-    for page_num in range(1, 201): # Assuming max 200 pages per issue
-        # --- MODIFIED LINE: Check if the page already exists in Azure Blob Storage ---
-        if azure_client.blob_exists(PUBLISHER_NAME, date, page_num, "jpeg"):
-            logger.info(f"Page {page_num:03d} for {date_str} already exists in Azure. Skipping download and conversion.")
-            pages_converted += 1 # Count as processed even if skipped
-            continue # Move to the next page
-
-        # --- MODIFIED LINE: Reduced sleep for potentially faster processing ---
-        time.sleep(0.1) # Adjusted from 0.5s. Adjust if rate limits hit.
-        formatted_page_num = f"{page_num:04d}"
-        pdf_url = f"{base_pdf_url}{formatted_page_num}.pdf" # Defined here
-        
-        temp_pdf_name = f"page_{formatted_page_num}.pdf"
-        temp_pdf_path = Path(TEMP_DIR) / temp_pdf_name
-        
-        temp_jpg_name = f"{page_num}.jpeg"
-        temp_jpg_path = Path(TEMP_DIR) / temp_jpg_name
-        
-        logger.info(f"Attempting to download {pdf_url}")
-        
-        try:
-            response = requests.get(pdf_url, stream=True, timeout=10)
-            
+    # One prefix listing per date instead of a blob_exists round-trip per page
+    if existing_pages is None:
+        existing_pages = list_existing_pages(azure_client, date)
+    if existing_pages:
+        logger.info(f"{len(existing_pages)} page(s) for {date_str} already exist in Azure. Skipping download and conversion for them.")
+        pages_converted += len(existing_pages) # Count as processed even if skipped
+    page_url = lambda page_num: f"{base_pdf_url}{PAGE_NUMS[page_num - 1]}.pdf"
+    last_page = find_last_page(page_url, existing_pages)
+    logger.info(f"Issue for {date_str} has {last_page} page(s).")
+    page_urls = [(page_num, page_url(page_num)) for page_num in get_candidate_pages(existing_pages, last_page)]
+
+    # Pages are converted and uploaded in the background, so page N+1 downloads while page N
+    # renders on the process pool and page N-1 uploads
+    upload_futures = {}
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+        for page_num, pdf_url, status_code, content, error in iter_issue_pages(page_urls):
+            if error is not None:
+                logger.error(f"Error downloading {pdf_url}: {error}. Stopping for this issue.")
+                break # Stop processing this date on network error
+
             # --- NEW BLOCK: Handle 429 Too Many Requests ---
-            if response.status_code == 429:
-                logger.warning(f"Received 429 Too Many Requests for {pdf_url}. Stopping for this issue to avoid further rate limiting.")
+            if status_code == 429:
+                logger.warning(f"Still receiving 429 Too Many Requests for {pdf_url} after backing off. Stopping for this issue to avoid further rate limiting.")
                 break # Stop processing this date
             # --- END NEW BLOCK ---
 
-            if response.status_code == 200:
-                with open(temp_pdf_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                logger.info(f"Successfully downloaded PDF for page {page_num}.")
-                
-                try:
-                    doc = fitz.open(temp_pdf_path)
-                    page = doc.load_page(0)
-                    # --- MODIFIED LINE: Reduced PDF conversion matrix for speed ---
-                    pix = page.get_pixmap(matrix=fitz.Matrix(1, 1)) # Changed from 2,2 to 1,1 for speed
-                    pix.save(temp_jpg_path, "jpeg")
-                    logger.info(f"Successfully converted page {page_num} to JPG.")
-                    
-                    # Upload to Azure and clean up local file
-                    if upload_to_azure(azure_client, temp_jpg_path, date, page_num, "jpeg"):
-                        pages_converted += 1
-                    
-                except Exception as convert_e:
-                    logger.error(f"Error converting page {page_num} to JPG: {convert_e}")
-                finally:
-                    if temp_pdf_path.exists():
-                        os.remove(temp_pdf_path)
-                    if temp_jpg_path.exists():
-                        os.remove(temp_jpg_path)
-                    logger.info(f"Removed temporary files for page {page_num}")
-
-            elif response.status_code in [403, 404]:
-                logger.info(f"Page {page_num} not found (Status Code {response.status_code}). Assuming end of issue.")
+            if status_code in [403, 404]:
+                logger.info(f"Page {page_num} not found (Status Code {status_code}). Assuming end of issue.")
                 break # No more pages for this date
-            else:
-                logger.warning(f"Failed to download {pdf_url} with status code {response.status_code}. Stopping for this issue.")
+            if status_code != 200:
+                logger.warning(f"Failed to download {pdf_url} with status code {status_code}. Stopping for this issue.")
                 break # Stop processing this date on unexpected error
-                
-            response.close()
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error downloading {pdf_url}: {e}. Stopping for this issue.")
-            break # Stop processing this date on network error
+            logger.debug("Successfully downloaded PDF for page %d.", page_num)
+
+            # The PDF is converted straight from the downloaded bytes, no temp file
+            upload_futures[page_num] = uploader.submit(convert_and_upload, azure_client, content, date, page_num)
+            
+    for page_num, future in upload_futures.items():
+        if future.result():
+            pages_converted += 1
+            existing_pages.add(page_num)
+            get_upload_state().record_page(date_str, page_num)
             
     return pages_converted
 
-def download_jpg_pages(date, date_format, azure_client):
+def copy_jpg_page(azure_client, jpg_url, date, page_num):
+    """
+    Has Azure fetch a JPG page straight from the CDN (Put Blob From URL), so the image never passes
+    through this machine. Falls back to downloading and uploading it locally if Azure can't fetch it.
+    Returns True if the page ended up in Azure.
+    """
+    RATE_LIMITER.wait(urlparse(jpg_url).netloc) # Azure's fetch still counts against the CDN's budget
+    if azure_client.upload_image_from_url(PUBLISHER_NAME, date, page_num, jpg_url, "jpeg"):
+        return True
+    
+    logger.warning(f"Azure could not copy page {page_num} from {jpg_url}. Downloading it locally instead.")
+    status_code, content, error = fetch_page(jpg_url)
+    if error is not None or status_code != 200:
+        logger.error(f"Failed to download {jpg_url}: {error or status_code}")
+        return False
+    return upload_to_azure(azure_client, content, date, page_num, "jpeg")
+
+def download_jpg_pages(date, date_format, azure_client, existing_pages=None):
     """
-    Downloads JPG pages directly and uploads them to Azure.
+    Copies JPG pages into Azure, either server-side from their URLs or by downloading and uploading them.
+    Pages are fetched concurrently and then uploaded in page order.
     Includes page-level existence check for resumption and 429 error handling.
+    `existing_pages` holds the page numbers already in Azure; it is listed from Azure if not given.
     """
     pages_downloaded = 0
     date_str = date.strftime(date_format)
+    date_iso = date.strftime('%Y-%m-%d') # Key for the local upload state
     base_jpg_url = f"https://flippingbook.am730.com.hk/daily-news/{date_str}/files/assets/common/page-html5-substrates/page"
     
-    for page_num in range(1, 201): # Assuming max 200 pages per issue
-        # --- MODIFIED LINE: Check if the page already exists in Azure Blob Storage ---
-        if azure_client.blob_exists(PUBLISHER_NAME, date, page_num, "jpeg"):
-            logger.info(f"Page {page_num:03d} for {date_str} already exists in Azure. Skipping download.")
-            pages_downloaded += 1 # Count as processed even if skipped
-            continue # Move to the next page
-
-        # --- MODIFIED LINE: Reduced sleep for potentially faster processing ---
-        time.sleep(0.1) # Adjusted from 0.5s. Adjust if rate limits hit.
-        formatted_page_num = f"{page_num:04d}"
-        jpg_url = f"{base_jpg_url}{formatted_page_num}_3.jpg" # Defined here
-        
-        temp_jpg_name = f"{page_num}.jpeg"
-        temp_jpg_path = Path(TEMP_DIR) / temp_jpg_name
+    # One prefix listing per date instead of a blob_exists round-trip per page
+    if existing_pages is None:
+        existing_pages = list_existing_pages(azure_client, date)
+    if existing_pages:
+        logger.info(f"{len(existing_pages)} page(s) for {date_str} already exist in Azure. Skipping download for them.")
+        pages_downloaded += len(existing_pages) # Count as processed even if skipped
+    page_url = lambda page_num: f"{base_jpg_url}{PAGE_NUMS[page_num - 1]}_3.jpg"
+    last_page = find_last_page(page_url, existing_pages)
+    logger.info(f"Issue for {date_str} has {last_page} page(s).")
+    page_urls = [(page_num, page_url(page_num)) for page_num in get_candidate_pages(existing_pages, last_page)]
+
+    upload_futures = {}
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+        if COPY_JPG_FROM_URL:
+            # The probe already confirmed pages 1..last_page, so Azure can fetch them all directly
+            for page_num, jpg_url in page_urls:
+                upload_futures[page_num] = uploader.submit(copy_jpg_page, azure_client, jpg_url, date, page_num)
+            page_urls = [] # Nothing left to download locally
         
-        logger.info(f"Attempting to download {jpg_url}")
+        # Uploads run in the background so the next window of pages is fetched while earlier ones upload
+        for page_num, jpg_url, status_code, content, error in iter_issue_pages(page_urls):
+            if error is not None:
+                logger.error(f"Error during download for page {page_num}: {error}. Stopping for this issue.")
+                break # Stop processing this date on network error
 
-        try:
-            response = requests.get(jpg_url, stream=True, timeout=10)
-            
             # --- NEW BLOCK: Handle 429 Too Many Requests ---
-            if response.status_code == 429:
-                logger.warning(f"Received 429 Too Many Requests for {jpg_url}. Stopping for this issue to avoid further rate limiting.")
+            if status_code == 429:
+                logger.warning(f"Still receiving 429 Too Many Requests for {jpg_url} after backing off. Stopping for this issue to avoid further rate limiting.")
                 break # Stop processing this date
             # --- END NEW BLOCK ---
 
-            if response.status_code == 200:
-                with open(temp_jpg_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                logger.info(f"Successfully downloaded page {page_num} as JPEG.")
-                
-                # Upload to Azure and clean up local file
-                if upload_to_azure(azure_client, temp_jpg_path, date, page_num, "jpeg"):
-                    pages_downloaded += 1
-                
-                os.remove(temp_jpg_path)
-                logger.info(f"Removed temporary file: {temp_jpg_path}")
-
-            elif response.status_code in [403, 404]:
+            if status_code in [403, 404]:
                 logger.info(f"Page {page_num} not found. Assuming end of issue.")
                 break # No more pages for this date
-            else:
-                logger.warning(f"Failed to download {jpg_url} with status code {response.status_code}. Stopping for this issue.")
+            if status_code != 200:
+                logger.warning(f"Failed to download {jpg_url} with status code {status_code}. Stopping for this issue.")
                 break # Stop processing this date on unexpected error
 
-            response.close()
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error during download for page {page_num}: {e}. Stopping for this issue.")
-            break # Stop processing this date on network error
+            logger.debug("Successfully downloaded page %d as JPEG.", page_num)
+        
+            # The downloaded bytes go straight to Azure without a temp file
+            upload_futures[page_num] = uploader.submit(upload_to_azure, azure_client, content, date, page_num, "jpeg")
+            
+    for page_num, future in upload_futures.items():
+        if future.result():
+            pages_downloaded += 1
+            existing_pages.add(page_num)
+            get_upload_state().record_page(date_iso, page_num)
             
     return pages_downloaded
 
-def scrape_issues_main():
-    """Main function to orchestrate the scraping and uploading process."""
+def load_format_cache():
+    """
+    Returns the cache of which URL format each month's issues use, keyed "YYYY-MM" -> index into FORMATS_TO_CHECK.
+    Loaded from FORMAT_CACHE_FILE on first use so the answer survives restarts.
+    """
+    global _format_cache
+    with _format_cache_lock:
+        if _format_cache is None:
+            try:
+                with open(FORMAT_CACHE_FILE) as f:
+                    _format_cache = json.load(f)
+            except (OSError, ValueError):
+                _format_cache = {}
+        return _format_cache
+
+def remember_format(date, format_index):
+    """Records the URL format used by a date's issue for its month and persists the cache."""
+    cache = load_format_cache()
+    month_key = date.strftime('%Y-%m')
+    with _format_cache_lock:
+        if cache.get(month_key) == format_index:
+            return
+        cache[month_key] = format_index
+        try:
+            with open(FORMAT_CACHE_FILE, 'w') as f:
+                json.dump(cache, f, indent=2, sort_keys=True)
+        except OSError as e:
+            logger.warning(f"Could not save format cache to {FORMAT_CACHE_FILE}: {e}")
+
+def download_issue(format_info, date, azure_client, existing_pages=None):
+    """Downloads an issue's pages using the given URL format. Returns the number of pages processed."""
+    if format_info['type'] == 'pdf':
+        return download_and_convert_pdf(date, azure_client, existing_pages)
+    return download_jpg_pages(date, format_info['date_format'], azure_client, existing_pages)
+
+def process_date(date, azure_client, existing_pages=None):
+    """
+    Finds which URL format the issue for a date uses, then downloads and uploads its pages.
+    Formats are tried in priority order, so a PDF is always preferred over the JPG copy.
+    The format cached for the date's month only saves its own probe: it is downloaded
+    directly once every higher-priority format has been probed and found missing.
+    `existing_pages` holds the page numbers already in Azure for the date, if already known.
+    Returns the number of pages processed (including pages already in Azure).
+    """
+    date_str = date.strftime('%Y-%m-%d')
+
+    # --- REMOVED BLOCK: Removed the early exit condition for page 1 existence ---
+    # if azure_client.blob_exists(PUBLISHER_NAME, date, 1, "jpeg"):
+    #     logger.info(f"First page for {date_str} already exists. Assuming issue was fully processed. Skipping date.")
+    #     continue # Move to the next date
+    # --- END REMOVED BLOCK ---
+
+    pages_found = 0
+    issue_found = False
+
+    # List once here, so a cached format that misses does not make the next format list Azure again
+    if existing_pages is None:
+        existing_pages = list_existing_pages(azure_client, date)
+
+    # Issues in the same month almost always share a format, so skip the HEAD probe for it
+    cached_index = load_format_cache().get(date.strftime('%Y-%m'))
+    
+    # Iterate through formats to find a working one for the current date
+    for format_index, format_info in enumerate(FORMATS_TO_CHECK):
+        if format_index == cached_index:
+            logger.info(f"Trying cached {format_info['type']} method for {date_str}.")
+            pages_found = download_issue(format_info, date, azure_client, existing_pages)
+            if pages_found:
+                issue_found = True
+                break
+            logger.info(f"Cached method found no pages for {date_str}. Checking the remaining formats.")
+            continue
+
+        date_str_formatted = date.strftime(format_info['date_format'])
+        check_url = format_info['url_format'].replace('{date}', date_str_formatted)
+        
+        logger.info(f"Checking for issue at: {check_url}")
+        
+        status_code, error = probe_page(check_url, timeout=10)
+        if error is not None:
+            logger.warning(f"Error checking {format_info['type']} URL for {date_str}: {error}")
+            continue
+
+        # --- CORRECTED BLOCK: Handle 429 Too Many Requests using check_url ---
+        if status_code == 429:
+            logger.warning(f"Still receiving 429 Too Many Requests for {check_url} after backing off. Stopping for this issue to avoid further rate limiting.")
+            issue_found = False # Important: Set this to False to prevent attempting download
+            break # Stop trying formats for this date and move to next date
+        # --- END CORRECTED BLOCK ---
+
+        if status_code == 200:
+            logger.info(f"Issue found using {format_info['type']} method.")
+            issue_found = True
+            remember_format(date, format_index)
+            pages_found = download_issue(format_info, date, azure_client, existing_pages)
+            break # Found a format and processed, move to next date
+    
+    if not issue_found:
+        logger.info(f"No issue found for {date_str} after checking all formats.")
+        pages_found = 0 # No pages processed for this date
+        
+    logger.info(f"Completed for {date_str} e-paper: {pages_found} pages processed (including skips).")
+    return pages_found
+
+def scrape_issues_main(resync=False):
+    """
+    Main function to orchestrate the scraping and uploading process.
+    With resync=True the local upload state is discarded and rebuilt from a full Azure listing,
+    so pages deleted from Azure since they were recorded are uploaded again.
+    """
     logger.info("=== Starting am730 E-Paper Scraper (Azure Version) ===")
     
     # Initialize Azure storage client
@@ -226,68 +485,49 @@ def scrape_issues_main():
 
     dates = list(get_date_range(START_DATE, END_DATE))
     logger.info(f"Found {len(dates)} weekdays to process")
+
+    # Pages recorded locally by earlier runs. Azure is only listed up front (once, for every date)
+    # when there is no local state yet, or on --resync; the listing then seeds the local state.
+    # Without a resync, blobs deleted from Azure after being recorded are not uploaded again.
+    upload_state = get_upload_state()
+    if resync:
+        upload_state.clear()
+    existing_by_date = upload_state.load_pages_by_date()
+    from_local_state = bool(existing_by_date)
+    if not from_local_state:
+        existing_by_date = azure_client.list_existing_pages_by_date(PUBLISHER_NAME, "jpeg")
+        if existing_by_date is None:
+            logger.warning("Could not list existing pages up front. Falling back to listing each date.")
+        else:
+            for date_str, pages in existing_by_date.items():
+                upload_state.record_pages(date_str, pages)
+
+    def existing_pages_for(date):
+        if existing_by_date is None:
+            return None
+        pages = existing_by_date.get(date.strftime('%Y-%m-%d'))
+        if pages:
+            return set(pages)
+        # Local state may just not know this date yet, so let the download list it in Azure
+        return None if from_local_state else set()
     
-    for i, date in enumerate(dates):
-        date_str = date.strftime('%Y-%m-%d')
-        logger.info(f"Processing date {i+1}/{len(dates)}: {date_str}")
-        
-        # --- REMOVED BLOCK: Removed the early exit condition for page 1 existence ---
-        # if azure_client.blob_exists(PUBLISHER_NAME, date, 1, "jpeg"):
-        #     logger.info(f"First page for {date_str} already exists. Assuming issue was fully processed. Skipping date.")
-        #     continue # Move to the next date
-        # --- END REMOVED BLOCK ---
-
-        pages_found = 0
-        issue_found = False
-        
-        # Define the URL formats to check, in order of priority (highest quality first)
-        formats_to_check = [
-            {'type': 'pdf', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/downloads/page0001.pdf', 'date_format': '%Y-%m-%d'},
-            {'type': 'jpg', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/page-html5-substrates/page0001_3.jpg', 'date_format': '%Y-%m-%d'},
-            {'type': 'jpg', 'url_format': 'https://flippingbook.am730.com.hk/daily-news/{date}/files/assets/common/page-html5-substrates/page0001_3.jpg', 'date_format': '%d_%m_%Y'},
-        ]
-        
-        # Iterate through formats to find a working one for the current date
-        for format_info in formats_to_check:
-            date_str_formatted = date.strftime(format_info['date_format'])
-            check_url = format_info['url_format'].replace('{date}', date_str_formatted)
-            
-            logger.info(f"Checking for issue at: {check_url}")
-            
+    # Issues are independent (distinct Azure prefixes), so several dates run at once (rate limited by SESSION)
+    with ThreadPoolExecutor(max_workers=DATE_WORKERS) as executor:
+        futures = {executor.submit(process_date, date, azure_client, existing_pages_for(date)): date for date in dates}
+        for i, future in enumerate(as_completed(futures)):
+            date_str = futures[future].strftime('%Y-%m-%d')
             try:
-                response = requests.head(check_url, timeout=10)
-
-                # --- CORRECTED BLOCK: Handle 429 Too Many Requests using check_url ---
-                if response.status_code == 429:
-                    logger.warning(f"Received 429 Too Many Requests for {check_url}. Stopping for this issue to avoid further rate limiting.")
-                    issue_found = False # Important: Set this to False to prevent attempting download
-                    break # Stop trying formats for this date and move to next date
-                # --- END CORRECTED BLOCK ---
-
-                if response.status_code == 200:
-                    logger.info(f"Issue found using {format_info['type']} method.")
-                    issue_found = True
-                    if format_info['type'] == 'pdf':
-                        pages_found = download_and_convert_pdf(date, azure_client)
-                    else:
-                        pages_found = download_jpg_pages(date, format_info['date_format'], azure_client)
-                    break # Found a format and processed, move to next date
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Error checking {format_info['type']} URL for {date_str}: {e}")
-        
-        if not issue_found:
-            logger.info(f"No issue found for {date.strftime('%Y-%m-%d')} after checking all formats.")
-            pages_found = 0 # No pages processed for this date
-            
-        logger.info(f"Completed for {date.strftime('%Y-%m-%d')} e-paper: {pages_found} pages processed (including skips).")
-        
-        if i < len(dates) - 1:
-            logger.info(f"Waiting 3 seconds before next issue...")
-            # --- MODIFIED LINE: Reduced sleep between issues ---
-            time.sleep(3) # Adjusted from 5s
-            # --- END MODIFIED LINE ---
+                future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error while processing {date_str}: {e}")
+            logger.info(f"Finished date {i+1}/{len(dates)}: {date_str}")
             
+    get_render_pool().shutdown()
     logger.info("=== am730 E-Paper Scraper Completed ===")
 
 if __name__ == "__main__":
-    scrape_issues_main()
+    parser = argparse.ArgumentParser(description="Scrape am730 e-paper issues and upload the pages to Azure Blob Storage.")
+    parser.add_argument("--resync", action="store_true",
+                        help=f"Rebuild {UPLOAD_STATE_DB} from a full Azure listing instead of trusting the recorded pages")
+    args = parser.parse_args()
+    scrape_issues_main(resync=args.resync)
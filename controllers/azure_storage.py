@@ -5,45 +5,105 @@ Azure Blob Storage utility for HK Newspaper project
 - Handles image upload/download with hierarchical organization
 - Supports publisher/YYYY/MM/DD/pageNum.extension structure
 - Automatic container creation and error handling
+- Sized HTTP connection pool so concurrent uploads don't starve for connections
 """
 
 import os
 import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
+from typing import Optional, List, Dict, Any, Set
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient, ContentSettings
 from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError, ClientAuthenticationError
 
 logger = logging.getLogger(__name__)
 
+# Connections kept open to the storage account; the SDK default (10) is below the scrapers' upload concurrency
+DEFAULT_CONNECTION_POOL_SIZE = 32
+# Content types stored on uploaded blobs, so browsers and CDNs serve them correctly
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "pdf": "application/pdf",
+}
+# Maximum number of sub-requests the Blob Batch API accepts in one call
+BATCH_DELETE_SIZE = 256
+# Parallel block uploads per blob (only used by the SDK for payloads above its single-put size)
+UPLOAD_MAX_CONCURRENCY = 4
+# Zero-padded page numbers used in blob names, _PAD3[page_num]
+_PAD3 = tuple(f"{page_num:03d}" for page_num in range(1000))
+
+def create_pooled_transport(connection_pool_size: int = DEFAULT_CONNECTION_POOL_SIZE) -> RequestsTransport:
+    """
+    Create an SDK transport backed by a requests.Session with a sized connection pool.
+    Clients built on the same transport share its connections; the session stays open
+    until transport.session.close() is called.
+    
+    Args:
+        connection_pool_size: Maximum number of pooled connections to the storage account
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=connection_pool_size, pool_maxsize=connection_pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Timeouts must be set on the transport: the SDK ignores them once a custom transport is passed
+    return RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=20,
+        read_timeout=60
+    )
+
 class AzureBlobStorage:
     """
     Azure Blob Storage utility for managing newspaper images
     with hierarchical namespace organization.
     """
     
-    def __init__(self, connection_string: str, container_name: str = "epaper"):
+    def __init__(self, connection_string: str, container_name: str = "epaper",
+                 connection_pool_size: int = DEFAULT_CONNECTION_POOL_SIZE):
         """
         Initialize Azure Blob Storage client.
         
         Args:
             connection_string: Azure storage account connection string
             container_name: Name of the blob container (default: newspaper-images)
+            connection_pool_size: Maximum number of pooled connections to the storage account
         """
         self.connection_string = connection_string
         self.container_name = container_name
-        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        
+        # Share one sized connection pool across all SDK requests
+        transport = create_pooled_transport(connection_pool_size)
+        self.http_session = transport.session
+        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string, transport=transport)
+        # One container client reused for every blob operation instead of rebuilding it per call
+        self.container_client = self.blob_service_client.get_container_client(container_name)
         self._ensure_container_exists()
     
+    @staticmethod
+    def _blob_name(publisher_name: str, date: datetime, page_num: int, file_extension: str) -> str:
+        """Build the hierarchical blob name: publisher/YYYY/MM/DD/pageNum.extension"""
+        padded = _PAD3[page_num] if 0 <= page_num < len(_PAD3) else f"{page_num:03d}"
+        return f"{publisher_name}/{date.strftime('%Y/%m/%d')}/{padded}.{file_extension}"
+    
+    @staticmethod
+    def _content_settings(file_extension: str) -> Optional[ContentSettings]:
+        """Return the content settings for a file extension, or None to keep the service default."""
+        content_type = CONTENT_TYPES.get(file_extension.lower())
+        return ContentSettings(content_type=content_type) if content_type else None
+    
     def _ensure_container_exists(self):
         """Ensure the container exists, create if it doesn't"""
         try:
-            container_client = self.blob_service_client.get_container_client(self.container_name)
-            container_client.get_container_properties()
+            self.container_client.get_container_properties()
             logger.info(f"Using existing container: {self.container_name}")
         except ResourceNotFoundError:
             try:
-                container_client = self.blob_service_client.create_container(self.container_name)
+                self.blob_service_client.create_container(self.container_name)
                 logger.info(f"Created new container: {self.container_name}")
             except Exception as e:
                 logger.error(f"Failed to create container {self.container_name}: {e}")
@@ -75,26 +135,22 @@ class AzureBlobStorage:
         """
         try:
             # Create hierarchical path: publisher/YYYY/MM/DD/pageNum.extension
-            year = date.strftime("%Y")
-            month = date.strftime("%m")
-            day = date.strftime("%d")
+            blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+            blob_client = self.container_client.get_blob_client(blob_name)
             
-            blob_name = f"{publisher_name}/{year}/{month}/{day}/{page_num:03d}.{file_extension}"
-            
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
-            
-            # Check if blob exists
-            blob_exists = blob_client.exists()
-            
-            if blob_exists and not overwrite:
+            # Only pay for the existence check when an existing blob must be kept
+            if not overwrite and blob_client.exists():
                 logger.warning(f"Blob already exists and overwrite=False: {blob_name}")
                 return blob_client.url
             
             # Upload the blob
-            blob_client.upload_blob(image_data, overwrite=overwrite)
+            blob_client.upload_blob(
+                image_data,
+                overwrite=overwrite,
+                length=len(image_data),
+                max_concurrency=UPLOAD_MAX_CONCURRENCY,
+                content_settings=self._content_settings(file_extension)
+            )
             
             logger.info(f"Successfully uploaded: {blob_name}")
             return blob_client.url
@@ -103,6 +159,44 @@ class AzureBlobStorage:
             logger.error(f"Failed to upload image {publisher_name}/{date.strftime('%Y/%m/%d')}/{page_num:03d}.{file_extension}: {e}")
             return None
     
+    def upload_image_from_url(self,
+                              publisher_name: str,
+                              date: datetime,
+                              page_num: int,
+                              source_url: str,
+                              file_extension: str = "jpg",
+                              overwrite: bool = True) -> Optional[str]:
+        """
+        Have Azure copy an image from a public URL (Put Blob From URL), so the data
+        does not pass through this machine.
+        
+        Args:
+            publisher_name: Name of the newspaper publisher
+            date: Publication date
+            page_num: Page number (will be zero-padded to 3 digits)
+            source_url: Publicly readable URL of the image
+            file_extension: File extension (jpg, pdf, png, etc.)
+            overwrite: Whether to overwrite existing files (default: True)
+        
+        Returns:
+            str: The blob URL if successful, None if failed (e.g. the source refused Azure's request)
+        """
+        try:
+            blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+            blob_client = self.container_client.get_blob_client(blob_name)
+            blob_client.upload_blob_from_url(
+                source_url,
+                overwrite=overwrite,
+                content_settings=self._content_settings(file_extension)
+            )
+            
+            logger.info(f"Successfully copied from URL: {blob_name}")
+            return blob_client.url
+            
+        except Exception as e:
+            logger.error(f"Failed to copy image from {source_url} to {publisher_name}/{date.strftime('%Y/%m/%d')}/{page_num:03d}.{file_extension}: {e}")
+            return None
+    
     def download_image(self, 
                       publisher_name: str, 
                       date: datetime, 
@@ -121,16 +215,8 @@ class AzureBlobStorage:
             bytes: Image data if found, None if not found
         """
         try:
-            year = date.strftime("%Y")
-            month = date.strftime("%m")
-            day = date.strftime("%d")
-            
-            blob_name = f"{publisher_name}/{year}/{month}/{day}/{page_num:03d}.{file_extension}"
-            
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
+            blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+            blob_client = self.container_client.get_blob_client(blob_name)
             
             if not blob_client.exists():
                 logger.warning(f"Blob not found: {blob_name}")
@@ -164,7 +250,6 @@ class AzureBlobStorage:
             List of dictionaries with blob information
         """
         try:
-            container_client = self.blob_service_client.get_container_client(self.container_name)
             
             # Build prefix for hierarchical filtering
             prefix = ""
@@ -177,7 +262,7 @@ class AzureBlobStorage:
             if day:
                 prefix += f"{day}/"
             
-            blobs = container_client.list_blobs(
+            blobs = self.container_client.list_blobs(
                 name_starts_with=prefix
             )
             
@@ -217,16 +302,8 @@ class AzureBlobStorage:
             bool: True if successful, False if failed or not found
         """
         try:
-            year = date.strftime("%Y")
-            month = date.strftime("%m")
-            day = date.strftime("%d")
-            
-            blob_name = f"{publisher_name}/{year}/{month}/{day}/{page_num:03d}.{file_extension}"
-            
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
+            blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+            blob_client = self.container_client.get_blob_client(blob_name)
             
             if not blob_client.exists():
                 logger.warning(f"Blob not found for deletion: {blob_name}")
@@ -257,18 +334,82 @@ class AzureBlobStorage:
         Returns:
             str: The blob URL
         """
-        year = date.strftime("%Y")
-        month = date.strftime("%m")
-        day = date.strftime("%d")
+        blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+        blob_client = self.container_client.get_blob_client(blob_name)
         
-        blob_name = f"{publisher_name}/{year}/{month}/{day}/{page_num:03d}.{file_extension}"
+        return blob_client.url
+    
+    def list_existing_pages(self,
+                            publisher_name: str,
+                            date: datetime,
+                            file_extension: Optional[str] = None) -> Set[int]:
+        """
+        List the page numbers already uploaded for a publisher and date.
+        Uses a single prefix listing instead of one existence check per page.
         
-        blob_client = self.blob_service_client.get_blob_client(
-            container=self.container_name, 
-            blob=blob_name
-        )
+        Args:
+            publisher_name: Name of the newspaper publisher
+            date: Publication date
+            file_extension: Only count blobs with this extension (default: any)
         
-        return blob_client.url
+        Returns:
+            Set of page numbers found, empty if none or on failure
+        """
+        try:
+            prefix = f"{publisher_name}/{date.strftime('%Y/%m/%d')}/"
+            
+            pages = set()
+            for blob in self.container_client.list_blobs(name_starts_with=prefix):
+                page_part, _, extension = blob.name[len(prefix):].partition(".")
+                if file_extension and extension != file_extension:
+                    continue
+                if page_part.isdigit():
+                    pages.add(int(page_part))
+            
+            logger.info(f"Found {len(pages)} existing pages with prefix: {prefix}")
+            return pages
+            
+        except Exception as e:
+            logger.error(f"Failed to list existing pages for {publisher_name}/{date.strftime('%Y/%m/%d')}: {e}")
+            return set()
+    
+    def list_existing_pages_by_date(self,
+                                    publisher_name: str,
+                                    file_extension: Optional[str] = None) -> Optional[Dict[str, Set[int]]]:
+        """
+        List the page numbers already uploaded for every date of a publisher.
+        Uses a single (paged) listing of the publisher prefix instead of one listing per date.
+        
+        Args:
+            publisher_name: Name of the newspaper publisher
+            file_extension: Only count blobs with this extension (default: any)
+        
+        Returns:
+            Dictionary mapping "YYYY-MM-DD" to the set of page numbers found,
+            or None on failure so callers can fall back to per-date listing
+        """
+        try:
+            prefix = f"{publisher_name}/"
+            
+            pages_by_date = {}
+            for blob in self.container_client.list_blobs(name_starts_with=prefix):
+                # Blob names look like publisher/YYYY/MM/DD/NNN.ext
+                parts = blob.name[len(prefix):].split("/")
+                if len(parts) != 4:
+                    continue
+                year, month, day, filename = parts
+                page_part, _, extension = filename.partition(".")
+                if file_extension and extension != file_extension:
+                    continue
+                if page_part.isdigit():
+                    pages_by_date.setdefault(f"{year}-{month}-{day}", set()).add(int(page_part))
+            
+            logger.info(f"Found existing pages for {len(pages_by_date)} dates with prefix: {prefix}")
+            return pages_by_date
+            
+        except Exception as e:
+            logger.error(f"Failed to list existing pages for {publisher_name}: {e}")
+            return None
     
     def blob_exists(self, 
                    publisher_name: str, 
@@ -288,16 +429,8 @@ class AzureBlobStorage:
             bool: True if blob exists, False otherwise
         """
         try:
-            year = date.strftime("%Y")
-            month = date.strftime("%m")
-            day = date.strftime("%d")
-            
-            blob_name = f"{publisher_name}/{year}/{month}/{day}/{page_num:03d}.{file_extension}"
-            
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
+            blob_name = self._blob_name(publisher_name, date, page_num, file_extension)
+            blob_client = self.container_client.get_blob_client(blob_name)
             
             return blob_client.exists()
             
@@ -306,12 +439,14 @@ class AzureBlobStorage:
             return False
 
 
-def create_azure_storage_client(container_name: str = "epaper") -> AzureBlobStorage:
+def create_azure_storage_client(container_name: str = "epaper",
+                                connection_pool_size: int = DEFAULT_CONNECTION_POOL_SIZE) -> AzureBlobStorage:
     """
     Factory function to create Azure Blob Storage client using environment variables.
     
     Args:
         container_name: Name of the blob container
+        connection_pool_size: Maximum number of pooled connections to the storage account
     
     Returns:
         AzureBlobStorage: Configured storage client
@@ -323,4 +458,4 @@ def create_azure_storage_client(container_name: str = "epaper") -> AzureBlobStor
     if not connection_string:
         raise ValueError("AZURE_STORAGE_CONNECTION_STRING environment variable is required")
     
-    return AzureBlobStorage(connection_string, container_name) 
\ No newline at end of file
+    return AzureBlobStorage(connection_string, container_name, connection_pool_size) 
\ No newline at end of file
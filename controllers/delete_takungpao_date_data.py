@@ -3,13 +3,22 @@
 
 import os
 import sys
+import atexit
+import argparse
+import functools
 import logging
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
 
-# Import BlobServiceClient directly as we cannot modify controllers/azure_storage.py
 from azure.storage.blob import BlobServiceClient
-from azure.core.exceptions import ResourceNotFoundError # Import for better error handling
+from azure.core.exceptions import ResourceNotFoundError, HttpResponseError # Import for better error handling
+
+# Make the repo root importable when run as a script (python controllers/delete_takungpao_date_data.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from controllers.azure_storage import BATCH_DELETE_SIZE, create_pooled_transport
 
 # Setup logging for this utility script
 logging.basicConfig(
@@ -23,56 +32,220 @@ logger = logging.getLogger(__name__)
 
 PUBLISHER_NAME = "TaKungPao"
 
-def delete_blobs_by_prefix_independent(connection_string: str, container_name: str, prefix: str) -> int:
+def _concurrency_from_env(name: str, default: int) -> int:
+    """Reads a worker count from the environment, falling back to `default` if unset or invalid. Always at least 1."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.error(f"{name} must be an integer, got '{value}'. Using the default of {default}.")
+        return default
+
+# Number of delete requests in flight at once; tune without code changes via the environment
+DELETE_CONCURRENCY = _concurrency_from_env("AZURE_DELETE_CONCURRENCY", 30)
+# Batches queued ahead of the workers while the listing continues
+MAX_BATCHES_IN_FLIGHT = DELETE_CONCURRENCY * 2
+# Blob names returned per listing page (the service maximum)
+LIST_PAGE_SIZE = 5000
+# Deletions failing with these statuses are retried at the end instead of being reported lost
+THROTTLED_STATUS_CODES = (429, 503)
+# Worker threads for that slower retry pass
+RETRY_CONCURRENCY = max(1, DELETE_CONCURRENCY // 4)
+# SDK retry policy for every request: more attempts than the default 3, with short exponential
+# backoff (1s + 2^n, jittered) so transient 500/503 responses recover without a manual rerun
+CLIENT_RETRY_OPTIONS = dict(retry_total=6, initial_backoff=1, increment_base=2, random_jitter_range=1)
+
+# One pooled HTTP session shared by every client this script builds, so connections and TLS
+# sessions are reused across dates; sized so every delete worker gets a keep-alive connection
+_SHARED_TRANSPORT = create_pooled_transport(DELETE_CONCURRENCY)
+atexit.register(_SHARED_TRANSPORT.session.close)
+
+def _is_deleted(status_code) -> bool:
+    """True if a delete response means the blob is gone. 404 counts: it was already deleted."""
+    return status_code is not None and (status_code < 400 or status_code == 404)
+
+def _try_delete(container_client, blob_name):
+    """
+    Deletes a single blob. Runs in a worker thread.
+    Returns (blob_name, status_code, error) so logging happens outside the worker;
+    status_code is None if no response was received.
+    """
+    try:
+        container_client.delete_blob(blob_name)
+        return blob_name, 202, None
+    except HttpResponseError as e:
+        return blob_name, e.status_code, e
+    except Exception as e:
+        return blob_name, None, e
+
+def _try_delete_batch(container_client, blob_names):
+    """
+    Deletes up to BATCH_DELETE_SIZE blobs in a single Blob Batch request. Runs in a worker thread.
+    Returns a list of (blob_name, status_code, error) tuples, or None if the batch itself failed
+    (rejected by the service, or a transport error after the SDK's retries), so its blobs are retried one by one.
+    """
+    try:
+        responses = container_client.delete_blobs(*blob_names, raise_on_any_failure=False)
+    except Exception as e:
+        logger.warning(f"Batch delete of {len(blob_names)} blobs failed, falling back to single deletes: {e}")
+        return None
+    return [(blob_name, response.status_code, None) for blob_name, response in zip(blob_names, responses)]
+
+def _log_delete_results(results, throttled=None) -> int:
+    """
+    Logs (blob_name, status_code, error) tuples and returns the number of blobs deleted.
+    Throttled blobs are queued in `throttled` for a later retry instead of being reported, if given.
+    """
+    deleted_count = 0
+    for blob_name, status_code, error in results:
+        if _is_deleted(status_code):
+            logger.debug("Successfully deleted blob: %s", blob_name)
+            deleted_count += 1
+        elif throttled is not None and status_code in THROTTLED_STATUS_CODES:
+            throttled.append(blob_name)
+        else:
+            logger.error(f"Failed to delete blob '{blob_name}': {error or f'status {status_code}'}")
+    return deleted_count
+
+def _collect_batch(chunk, future, rejected, throttled) -> int:
+    """Logs the outcome of a finished batch future, queueing its blobs in `rejected` if the batch was refused."""
+    results = future.result()
+    if results is None:
+        rejected.extend(chunk)
+        return 0
+    return _log_delete_results(results, throttled)
+
+@dataclass
+class DeleteProgress:
+    """Running counts for one prefix, kept by the caller so they survive an error part-way through."""
+    listed: int = 0
+    deleted: int = 0
+
+def delete_blobs_concurrently(container_client, name_pages, progress: DeleteProgress) -> DeleteProgress:
+    """
+    Deletes blobs while they are still being listed, on a pool of DELETE_CONCURRENCY threads,
+    as Blob Batch requests of up to BATCH_DELETE_SIZE blobs. At most MAX_BATCHES_IN_FLIGHT
+    batches are queued at once, so memory stays bounded by the listing page size.
+    Batches that fail as a whole are retried one blob per request, and blobs the
+    service throttled (429/503) get one more pass with RETRY_CONCURRENCY threads at the end.
+
+    Args:
+        name_pages: Iterable of blob name lists, one per listing page
+        progress: Updated as blobs are listed and deleted, so the counts stay valid if listing fails
+
+    Returns:
+        DeleteProgress: `progress`, with the final counts
+    """
+    rejected = []
+    throttled = []
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as executor:
+        try:
+            for names in name_pages:
+                progress.listed += len(names)
+                for i in range(0, len(names), BATCH_DELETE_SIZE):
+                    chunk = names[i:i + BATCH_DELETE_SIZE]
+                    in_flight.append((chunk, executor.submit(_try_delete_batch, container_client, chunk)))
+
+                # Collect finished batches, and wait for the oldest ones while too many are queued
+                while in_flight and (len(in_flight) > MAX_BATCHES_IN_FLIGHT or in_flight[0][1].done()):
+                    progress.deleted += _collect_batch(*in_flight.popleft(), rejected, throttled)
+                    logger.info(f"Deleted {progress.deleted}/{progress.listed} listed blobs")
+        finally:
+            # Count the batches already sent, even if the listing failed part-way
+            while in_flight:
+                progress.deleted += _collect_batch(*in_flight.popleft(), rejected, throttled)
+                logger.info(f"Deleted {progress.deleted}/{progress.listed} listed blobs")
+
+        if rejected:
+            logger.warning(f"Batch delete failed. Deleting {len(rejected)} blobs one by one.")
+            results = executor.map(lambda name: _try_delete(container_client, name), rejected)
+            progress.deleted += _log_delete_results(results, throttled)
+
+    if throttled:
+        # Back off: retry with fewer workers so the account can catch up
+        logger.warning(f"Throttled on {len(throttled)} blobs. Retrying them with {RETRY_CONCURRENCY} workers.")
+        with ThreadPoolExecutor(max_workers=RETRY_CONCURRENCY) as executor:
+            progress.deleted += _log_delete_results(executor.map(lambda name: _try_delete(container_client, name), throttled))
+    return progress
+
+@functools.lru_cache(maxsize=4)
+def _get_container_client(connection_string: str, container_name: str):
     """
-    Deletes all blobs within the specified container that start with the given prefix.
+    Returns the container client for a connection string and container, building it on the shared
+    transport on first use. The client is thread-safe, so delete workers and dates share it.
     This function is independent and does not rely on the AzureBlobStorage class in controllers.
+    """
+    blob_service_client = BlobServiceClient.from_connection_string(connection_string, transport=_SHARED_TRANSPORT, **CLIENT_RETRY_OPTIONS)
+    return blob_service_client.get_container_client(container_name)
+
+def delete_blobs_by_prefix_independent(container_client, prefix: str) -> int:
+    """
+    Deletes all blobs within the client's container that start with the given prefix.
     Returns the number of blobs deleted.
     """
-    deleted_count = 0
+    container_name = container_client.container_name
+    progress = DeleteProgress()
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client(container_name)
-
-        # Check if container exists before proceeding
+        # Stream the listing page by page so deletions start before it finishes; names only,
+        # since blob properties are never used and only add XML to download and parse
         try:
-            container_client.get_container_properties()
+            name_pages = container_client.list_blob_names(name_starts_with=prefix, results_per_page=LIST_PAGE_SIZE).by_page()
+            delete_blobs_concurrently(container_client, (list(page) for page in name_pages), progress)
         except ResourceNotFoundError:
+            # A missing container surfaces on the first listing page; no separate existence check needed
             logger.error(f"Azure container '{container_name}' not found. Cannot proceed with deletion.")
-            return 0
-        except Exception as e:
-            logger.error(f"Error checking container '{container_name}' existence: {e}")
-            return 0
+            return progress.deleted
 
-        blob_list = container_client.list_blobs(name_starts_with=prefix)
-        blobs_to_delete = [blob.name for blob in blob_list]
-
-        if not blobs_to_delete:
+        if not progress.listed:
             logger.info(f"No blobs found with prefix '{prefix}' for deletion in container '{container_name}'.")
-            return 0
-
-        logger.info(f"Found {len(blobs_to_delete)} blobs to delete with prefix '{prefix}' in container '{container_name}'.")
-        
-        for blob_name in blobs_to_delete:
-            try:
-                blob_client = container_client.get_blob_client(blob_name)
-                blob_client.delete_blob()
-                logger.info(f"Successfully deleted blob: {blob_name}")
-                deleted_count += 1
-            except Exception as e:
-                logger.error(f"Failed to delete blob '{blob_name}': {e}")
+        else:
+            logger.info(f"Listed {progress.listed} blobs for deletion with prefix '{prefix}' in container '{container_name}'.")
         
     except Exception as e:
-        logger.error(f"Error initializing BlobServiceClient or listing blobs for prefix '{prefix}': {e}")
+        logger.error(f"Error listing or deleting blobs for prefix '{prefix}' after deleting {progress.deleted} blobs: {e}")
     
+    return progress.deleted
+
+def delete_date_data_independent(container_client, target_date: datetime) -> int:
+    """
+    Deletes all blobs for a specific date, reusing the given container client.
+    Returns the number of blobs deleted.
+    """
+    # Construct the prefix for blobs related to the target_date
+    date_path = target_date.strftime('%Y/%m/%d')
+    date_iso = date_path.replace('/', '-')
+    date_path_prefix = f"{PUBLISHER_NAME}/{date_path}/"
+
+    logger.info(f"Deleting all blobs for {date_iso} with the prefix: '{date_path_prefix}'.")
+    deleted_count = delete_blobs_by_prefix_independent(container_client, date_path_prefix)
+    logger.info(f"Deletion complete for {date_iso}. Deleted {deleted_count} blobs.")
     return deleted_count
 
-def delete_date_data_independent(target_date: datetime):
+def parse_date(value: str) -> datetime:
+    """argparse type for YYYY-MM-DD dates."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def main():
     """
-    Connects to Azure Blob Storage and deletes all blobs for a specific date.
-    This version is independent and does not rely on the AzureBlobStorage class in controllers.
-    Includes a confirmation prompt.
+    Deletes all blobs for every date in --start..--end (inclusive) from Azure Blob Storage,
+    reusing one container client for the whole range. Asks for confirmation unless --yes is given.
     """
+    parser = argparse.ArgumentParser(description=f"Delete {PUBLISHER_NAME} e-paper pages from Azure Blob Storage for a date range.")
+    parser.add_argument("--start", type=parse_date, required=True, help="First date to delete (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, help="Last date to delete (YYYY-MM-DD, default: --start)")
+    parser.add_argument("--yes", "-y", action="store_true",
+                        help="Delete without asking for confirmation (also enabled by AZURE_DELETE_ASSUME_YES=1)")
+    args = parser.parse_args()
+    end_date = args.end or args.start
+    if end_date < args.start:
+        parser.error("--end must not be before --start")
+
     connection_string = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
     container_name = os.environ.get("AZURE_CONTAINER_NAME", "epaper-images") # Default container name
 
@@ -80,25 +253,30 @@ def delete_date_data_independent(target_date: datetime):
         logger.error("AZURE_STORAGE_CONNECTION_STRING environment variable not set. Cannot proceed.")
         sys.exit(1)
 
-    # Construct the prefix for blobs related to the target_date
-    date_path_prefix = f"{PUBLISHER_NAME}/{target_date.strftime('%Y')}/{target_date.strftime('%m')}/{target_date.strftime('%d')}/"
-    
-    logger.info(f"Preparing to delete all data for {target_date.strftime('%Y-%m-%d')} from Azure Blob Storage.")
-    logger.info(f"This will delete all blobs with the prefix: '{date_path_prefix}' in container '{container_name}'.")
-    
-    confirm = input("Are you sure you want to proceed with deletion (y/N)? ").strip().lower()
-    
-    if confirm == 'y':
-        logger.info("Starting deletion...")
-        deleted_count = delete_blobs_by_prefix_independent(connection_string, container_name, date_path_prefix)
-        logger.info(f"Deletion complete for {target_date.strftime('%Y-%m-%d')}. Deleted {deleted_count} blobs.")
-    else:
-        logger.info("Deletion cancelled by user.")
+    start_iso = args.start.strftime('%Y-%m-%d')
+    end_iso = end_date.strftime('%Y-%m-%d')
+    logger.info(f"Running deletion utility script for {PUBLISHER_NAME} from {start_iso} to {end_iso}")
+    logger.info(f"This will delete all blobs under '{PUBLISHER_NAME}/' for those dates in container '{container_name}'.")
 
-if __name__ == "__main__":
-    # --- IMPORTANT: Specify the date you want to delete here ---
-    date_to_delete = datetime(2018, 7, 27) 
-    # -----------------------------------------------------------
+    assume_yes = args.yes or os.environ.get("AZURE_DELETE_ASSUME_YES") == "1"
+    if not assume_yes:
+        # Unattended runs (cron, CI, piped stdin) must opt in explicitly rather than hang on a prompt
+        if not sys.stdin.isatty():
+            logger.error("No terminal to confirm deletion. Pass --yes or set AZURE_DELETE_ASSUME_YES=1 to run unattended.")
+            sys.exit(1)
+        confirm = input("Are you sure you want to proceed with deletion (y/N)? ").strip().lower()
+        if confirm != 'y':
+            logger.info("Deletion cancelled by user.")
+            return
+
+    logger.info("Starting deletion...")
+    container_client = _get_container_client(connection_string, container_name)
+    total_deleted = 0
+    current_date = args.start
+    while current_date <= end_date:
+        total_deleted += delete_date_data_independent(container_client, current_date)
+        current_date += timedelta(days=1)
+    logger.info(f"Deleted {total_deleted} blobs for {start_iso} to {end_iso}.")
 
-    logger.info(f"Running deletion utility script for {PUBLISHER_NAME} on {date_to_delete.strftime('%Y-%m-%d')}")
-    delete_date_data_independent(date_to_delete)
+if __name__ == "__main__":
+    main()
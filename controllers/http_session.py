@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP session utility for HK Newspaper scrapers
+- Builds a pooled requests.Session so TCP/TLS connections are reused across pages
+- Retries connection failures at the transport level
+- Retries 429/5xx responses with exponential backoff, jitter and Retry-After support
+- Sets default headers once instead of per request
+- Optionally applies a per-host rate limiter to every request the session sends,
+  slowing it down on 429 responses and letting it recover on success
+- Reads streamed bodies in large chunks straight from the raw socket
+"""
+
+import io
+import logging
+import random
+import shutil
+import time
+from typing import Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from controllers.rate_limiter import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Chunk size for reading streamed bodies; pages are a few hundred KB, so most fit in one read
+READ_CHUNK_SIZE = 1 << 20
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that waits on a per-host rate limiter before sending each request, and
+    adapts that host's rate to the responses (halved on 429, slowly restored otherwise).
+    """
+
+    def __init__(self, rate_limiter: Optional[HostRateLimiter] = None, **kwargs):
+        self.rate_limiter = rate_limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.rate_limiter is None:
+            return super().send(request, **kwargs)
+
+        host = urlparse(request.url).netloc
+        self.rate_limiter.wait(host)
+        response = super().send(request, **kwargs)
+        if response.status_code == 429:
+            new_rate = self.rate_limiter.slow_down(host)
+            logger.warning(f"Rate limited by {host}; reducing request rate to {new_rate:.2f}/s.")
+        else:
+            self.rate_limiter.speed_up(host)
+        return response
+
+
+def create_http_session(pool_connections: int = 4,
+                        pool_maxsize: int = 32,
+                        rate_limiter: Optional[HostRateLimiter] = None) -> requests.Session:
+    """
+    Factory function to create a pooled HTTP session.
+
+    Args:
+        pool_connections: Number of per-host connection pools to cache
+        pool_maxsize: Maximum number of keep-alive connections per host
+        rate_limiter: Per-host limiter applied to every request sent through the session,
+            including retries (default: no limit)
+
+    Returns:
+        requests.Session: Session with retrying adapters mounted for http:// and https://
+    """
+    # Only connection/read errors are retried here; retryable status codes are handled by
+    # request_with_backoff(). status=0 and respect_retry_after_header=False stop urllib3 from
+    # retrying 429/503 + Retry-After inside adapter.send(), which would bypass the rate limiter.
+    retries = Retry(total=3, connect=3, read=3, status=0, backoff_factor=0.3,
+                    raise_on_status=False, respect_retry_after_header=False)
+    adapter = RateLimitedAdapter(
+        rate_limiter=rate_limiter,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Connection': 'keep-alive',
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Return the Retry-After header as seconds, or None if absent or not a number."""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        return None # HTTP-date form is not worth parsing here; fall back to exponential backoff
+
+
+def request_with_backoff(session: requests.Session,
+                         method: str,
+                         url: str,
+                         attempts: int = 5,
+                         base: float = 1.0,
+                         cap: float = 60.0,
+                         jitter: float = 0.5,
+                         **kwargs) -> requests.Response:
+    """
+    Send a request, retrying 429 and transient 5xx responses with exponential backoff.
+
+    Args:
+        session: Session used to send the request
+        method: HTTP method (e.g. 'GET', 'HEAD')
+        url: Target URL
+        attempts: Maximum number of attempts before giving up
+        base: Initial backoff delay in seconds, doubled after each attempt
+        cap: Upper bound for a single delay in seconds
+        jitter: Maximum random extra delay in seconds, to spread out concurrent retries
+        **kwargs: Passed through to session.request (timeout, stream, headers, ...)
+
+    Returns:
+        requests.Response: The first non-retryable response, or the last response once attempts run out
+
+    Raises:
+        requests.exceptions.RequestException: If the request itself fails
+    """
+    for attempt in range(attempts):
+        response = session.request(method, url, **kwargs)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == attempts - 1:
+            return response
+
+        retry_after = _retry_after_seconds(response)
+        delay = min(cap, retry_after if retry_after is not None else base * 2 ** attempt)
+        delay += random.uniform(0, jitter)
+        logger.warning(f"Received {response.status_code} for {url}. Retrying in {delay:.1f}s (attempt {attempt + 1}/{attempts}).")
+        response.close()
+        time.sleep(delay)
+
+
+def read_body(response: requests.Response, chunk_size: int = READ_CHUNK_SIZE) -> bytes:
+    """
+    Read the body of a response sent with stream=True into memory.
+
+    Copies from the underlying urllib3 stream in large chunks instead of iterating
+    over iter_content() in small ones, so the copy stays mostly in C.
+
+    Args:
+        response: Streaming response whose body has not been consumed yet
+        chunk_size: Number of bytes to read per call
+
+    Returns:
+        bytes: The (decompressed) response body
+    """
+    response.raw.decode_content = True # Still undo gzip/deflate transfer encoding
+    buffer = io.BytesIO()
+    shutil.copyfileobj(response.raw, buffer, chunk_size)
+    return buffer.getvalue()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF rendering utility for HK Newspaper scrapers
+- Rasterizes the first page of an in-memory PDF straight to JPEG bytes
+- Runs rendering on a shared process pool (PyMuPDF is CPU-bound and not thread-safe)
+- Caps the pool size, since rendering stops scaling beyond a few workers
+- Encodes with libjpeg-turbo (simplejpeg) when installed, falling back to MuPDF's encoder
+"""
+
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+import fitz # PyMuPDF
+
+# Optional fast path. Unlike PyTurboJPEG, simplejpeg's wheels bundle libjpeg-turbo, so there is no
+# system library to install, and encoding is a large share of render time at TaKungPao's 2x zoom.
+# Without it (or numpy) pages are still encoded by MuPDF.
+try:
+    import numpy as np
+    import simplejpeg # SIMD libjpeg-turbo encoder, several times faster than MuPDF's baseline libjpeg
+except ImportError:
+    simplejpeg = None
+
+# Rendering throughput stops improving beyond ~4 processes, and each one holds a full page bitmap
+MAX_RENDER_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Shared rasterization pool, created by get_render_pool() on first use
+_render_pool_lock = threading.Lock()
+_render_pool = None
+
+
+@functools.lru_cache(maxsize=None)
+def _zoom_matrix(zoom: float) -> fitz.Matrix:
+    """Return the scaling matrix for a zoom factor, built once per worker process."""
+    return fitz.Matrix(zoom, zoom)
+
+
+def rasterize_first_page(pdf_bytes: bytes, zoom: float, jpg_quality: int) -> Tuple[int, bytes]:
+    """
+    Render the first page of an in-memory PDF to JPEG. Runs in a worker process.
+
+    Args:
+        pdf_bytes: Contents of the PDF file
+        zoom: Render scale (1.0 = 72 DPI)
+        jpg_quality: JPEG quality (0-100)
+
+    Returns:
+        Tuple of (page count of the PDF, JPEG bytes of its first page)
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        # No alpha channel: JPEG cannot store one, and RGB gives the encoder 3 bytes per pixel instead of 4
+        pix = doc.load_page(0).get_pixmap(matrix=_zoom_matrix(zoom), colorspace=fitz.csRGB, alpha=False)
+        if simplejpeg is None:
+            return doc.page_count, pix.tobytes(output="jpeg", jpg_quality=jpg_quality)
+        # View the pixmap samples as a height x width x RGB array without copying them
+        pixels = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return doc.page_count, simplejpeg.encode_jpeg(pixels, quality=jpg_quality, colorspace="RGB", fastdct=True)
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool used for rasterization, creating it on first use.
+    The first call usually comes from many worker threads at once, so creation is locked
+    to guarantee a single pool of MAX_RENDER_WORKERS processes.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=MAX_RENDER_WORKERS)
+        return _render_pool
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rate limiting utility for HK Newspaper scrapers
+- Token bucket limiter that replaces fixed time.sleep() politeness delays
+- Allows short bursts up to the bucket size while keeping the average rate
+- Thread-safe so it can be shared by concurrent download workers
+- Per-host variant so each origin gets its own budget
+- Adaptive: halves the rate when the server answers 429 and creeps back up on success
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `burst`. Each call to
+    acquire() consumes one token and only blocks when the bucket is empty.
+    The rate adapts to the server: slow_down() halves it (down to `min_rate`) and
+    speed_up() raises it additively back towards the configured maximum.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.1):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Average number of requests allowed per second (also the maximum adaptive rate)
+            burst: Maximum number of requests that may be issued back-to-back
+            min_rate: Lowest rate slow_down() may reduce to
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill at the current rate. Caller holds the lock."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        with self._lock:
+            self._refill()
+
+            # Reserve the token now (possibly going negative) so concurrent callers queue up
+            # behind each other instead of all waking at the same instant.
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def slow_down(self) -> float:
+        """Halve the rate (multiplicative decrease) after the server signalled overload. Returns the new rate."""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            return self.rate
+
+    def speed_up(self, step: float = 0.1) -> float:
+        """Raise the rate by `step` per second (additive increase), up to the configured maximum. Returns the new rate."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + step)
+            return self.rate
+
+
+class HostRateLimiter:
+    """
+    Per-host rate limiter: keeps an independent token bucket for every host so a slow
+    budget on one origin never delays requests to another.
+
+    Meant to be shared by every worker of a scraper (usually through create_http_session),
+    so the combined request rate stays polite however many dates and pages run at once.
+    This replaces the fixed time.sleep() delays between requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the per-host rate limiter.
+
+        Args:
+            rate: Average number of requests allowed per second, per host
+            burst: Maximum number of back-to-back requests, per host
+        """
+        self.rate = rate
+        self.burst = burst
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, host: str) -> RateLimiter:
+        """Return the limiter for `host`, creating it on first use."""
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate, self.burst)
+            return limiter
+
+    def wait(self, host: str) -> None:
+        """Block until a request to `host` is allowed."""
+        self._limiter(host).acquire()
+
+    def slow_down(self, host: str) -> float:
+        """Halve the request rate for `host`. Returns the new rate."""
+        return self._limiter(host).slow_down()
+
+    def speed_up(self, host: str) -> float:
+        """Let the request rate for `host` recover towards its maximum. Returns the new rate."""
+        return self._limiter(host).speed_up()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local upload state for HK Newspaper scrapers
+- Remembers which (date, page) pairs are already in Azure in a small SQLite file
+- Lets a resumed run skip listing the whole publisher prefix in Azure
+- Batches inserts so a crawl does not pay one commit per page
+- Thread-safe so it can be shared by concurrent date and upload workers
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+
+class UploadState:
+    """
+    SQLite-backed record of uploaded pages, keyed by date ("YYYY-MM-DD") and page number.
+    """
+
+    def __init__(self, db_path: str, commit_every: int = 100):
+        """
+        Open (or create) the state database.
+
+        Args:
+            db_path: Path of the SQLite file
+            commit_every: Number of recorded pages to buffer before committing
+        """
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploaded (date TEXT NOT NULL, page INTEGER NOT NULL, PRIMARY KEY (date, page))"
+        )
+        self._conn.commit()
+
+    def load_pages_by_date(self) -> Dict[str, Set[int]]:
+        """Return every recorded page, as a dictionary mapping "YYYY-MM-DD" to page numbers."""
+        pages_by_date = {}
+        with self._lock:
+            for date_str, page_num in self._conn.execute("SELECT date, page FROM uploaded"):
+                pages_by_date.setdefault(date_str, set()).add(page_num)
+        logger.info(f"Loaded recorded pages for {len(pages_by_date)} dates from {self.db_path}")
+        return pages_by_date
+
+    def record_pages(self, date_str: str, page_nums: Iterable[int]) -> None:
+        """Record pages of a date as uploaded. Commits once enough pages are buffered."""
+        rows = [(date_str, page_num) for page_num in page_nums]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO uploaded (date, page) VALUES (?, ?)", rows)
+            self._pending += len(rows)
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def record_page(self, date_str: str, page_num: int) -> None:
+        """Record a single page of a date as uploaded."""
+        self.record_pages(date_str, (page_num,))
+
+    def clear(self) -> None:
+        """Forget every recorded page, e.g. before reseeding the state from a fresh Azure listing."""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploaded")
+            self._conn.commit()
+            self._pending = 0
+        logger.info(f"Cleared recorded pages in {self.db_path}")
+
+    def close(self) -> None:
+        """Commit any buffered pages and close the database."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()